@@ -5,17 +5,27 @@ Supports flow: Client Credentials (service-to-service, workspace-level)
 
 """
 
+import asyncio
+import logging
 import time
 import httpx
 from dataclasses import dataclass, field
 from src.config import get_settings
 
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
-@dataclass
+# Proactively refresh this many seconds before the token expires, so no
+# request ever has to wait on the token endpoint
+_REFRESH_MARGIN = 120
+
+
+@dataclass(slots=True)
 class TokenInfo:
     """Stores OAuth token with expiry tracking."""
 
     access_token: str
+    # time.monotonic() deadline — immune to wall-clock (NTP) jumps
     expires_at: float
     refresh_token: str | None = None
     scopes: list[str] = field(default_factory=list)
@@ -23,16 +33,23 @@ class TokenInfo:
     @property
     def is_expired(self) -> bool:
         """Check if token is expired (with 60s buffer)."""
-        return time.time() >= (self.expires_at - 60)
+        return time.monotonic() >= (self.expires_at - 60)
 
 
 class BitbucketAuth:
     """Manages Bitbucket OAuth 2.0 authentication."""
 
-    def __init__(self):
-        self.settings = get_settings()
+    def __init__(self, http: httpx.AsyncClient | None = None):
+        self.settings = settings
         self._token: TokenInfo | None = None
-        self._http = httpx.AsyncClient(timeout=30.0)
+        # Serializes token acquisition so concurrent callers hitting an
+        # expired token trigger a single POST to the token endpoint
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        # Reuse the caller's pooled client when given one; token requests use
+        # absolute URLs so a client with an API base_url works too
+        self._owns_http = http is None
+        self._http = http or httpx.AsyncClient(timeout=30.0)
 
     async def get_access_token(self) -> str:
         """
@@ -44,13 +61,19 @@ class BitbucketAuth:
         Raises:
             httpx.HTTPStatusError: If token request fails
         """
+        # Fast path — valid token, no lock needed
         if self._token and not self._token.is_expired:
             return self._token.access_token
 
-        if self._token and self._token.refresh_token:
-            return await self._refresh_token()
+        async with self._lock:
+            # Re-check: another coroutine may have refreshed while we waited
+            if self._token and not self._token.is_expired:
+                return self._token.access_token
 
-        return await self._request_new_token()
+            if self._token and self._token.refresh_token:
+                return await self._refresh_token()
+
+            return await self._request_new_token()
 
     async def _request_new_token(self) -> str:
         """Request a new token using Client Credentials grant."""
@@ -65,8 +88,9 @@ class BitbucketAuth:
         # DEBUG: Log the response body before raising
         if response.status_code != 200:
             logger.error(
-                f"Token request failed: {response.status_code} "
-                f"Body: {response.text}"
+                "Token request failed: %s Body: %s",
+                response.status_code,
+                response.text,
             )
 
         response.raise_for_status()
@@ -74,10 +98,11 @@ class BitbucketAuth:
 
         self._token = TokenInfo(
             access_token=data["access_token"],
-            expires_at=time.time() + data.get("expires_in", 7200),
+            expires_at=time.monotonic() + data.get("expires_in", 7200),
             refresh_token=data.get("refresh_token"),
             scopes=data.get("scopes", "").split(),
         )
+        self._schedule_refresh(data.get("expires_in", 7200))
         return self._token.access_token
 
     async def _refresh_token(self) -> str:
@@ -98,11 +123,42 @@ class BitbucketAuth:
 
         self._token = TokenInfo(
             access_token=data["access_token"],
-            expires_at=time.time() + data.get("expires_in", 7200),
+            expires_at=time.monotonic() + data.get("expires_in", 7200),
             refresh_token=data.get("refresh_token", self._token.refresh_token),
         )
+        self._schedule_refresh(data.get("expires_in", 7200))
         return self._token.access_token
 
+    # ── Background Refresh ─────────────────────────────────────────────────
+
+    def _schedule_refresh(self, expires_in: float) -> None:
+        """
+        (Re)start the background task that renews the token shortly
+        before it expires. Called every time a new token is stored.
+        """
+        current = asyncio.current_task()
+        if self._refresh_task and self._refresh_task is not current:
+            self._refresh_task.cancel()
+        # Never spin: short-lived tokens refresh at half their lifetime
+        delay = max(expires_in - _REFRESH_MARGIN, expires_in / 2)
+        self._refresh_task = asyncio.create_task(self._refresh_after(delay))
+
+    async def _refresh_after(self, delay: float) -> None:
+        """Sleep until the refresh point, then renew the token."""
+        await asyncio.sleep(delay)
+        try:
+            async with self._lock:
+                if self._token and self._token.refresh_token:
+                    await self._refresh_token()
+                else:
+                    await self._request_new_token()
+        except Exception:
+            # get_access_token still refreshes lazily on the next call
+            logger.exception("Background token refresh failed")
+
     async def close(self):
-        """Cleanup HTTP client."""
-        await self._http.aclose()
+        """Cleanup HTTP client (only if this instance created it)."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._owns_http:
+            await self._http.aclose()
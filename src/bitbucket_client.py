@@ -6,25 +6,101 @@ PR review operations. All methods validate inputs and handle
 errors gracefully.
 """
 
+import asyncio
+import codecs
 import re
 import logging
+import time
 import httpx
+from functools import lru_cache
 from typing import Any
 from urllib.parse import quote
-import json
+import orjson
 from src.auth import BitbucketAuth
+from src.cache import LRUCache
 from src.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Compiled once at import — _validate_slug runs twice on every API call
+_SLUG_RE = re.compile(r"^[a-zA-Z0-9._-]+$")
+
+# Unified diff file boundary and the per-file header prefix
+_DIFF_BOUNDARY = "\ndiff --git "
+_DIFF_HEADER_PREFIX = "diff --git a/"
+
+# Git's extended header block is at most ~8 lines before the first hunk
+_DIFF_HEADER_MAX_LINES = 10
+
+# Commit hashes, from git's shortest 7-char abbreviation up to a full SHA-1
+_COMMIT_REF_RE = re.compile(r"[0-9a-f]{7,40}")
+
+# File contents at a full commit hash are cached until evicted; at a branch
+# (or abbreviated hash) they can move, so after _BRANCH_FILE_TTL they are
+# revalidated with their ETag
+_FILE_CACHE_SIZE = 128
+_BRANCH_FILE_TTL = 60.0
+
+# A PR's source commit only moves when someone pushes, so a short-lived
+# cache lets a burst of file reads for one PR share a single lookup
+_PR_REF_CACHE_SIZE = 64
+_PR_REF_TTL = 60.0
+
+# Per-file diffs this long are replaced by a placeholder in the manifest
+_INLINE_DIFF_MAX = 8_000
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP client shared by BitbucketAuth and
+    BitbucketClient, so token refreshes and API calls draw from
+    one keep-alive pool instead of two.
+    """
+    return httpx.AsyncClient(
+        base_url=settings.bitbucket_api_base,
+        # Multiplex concurrent API calls over one TLS connection
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+
+
+@lru_cache(maxsize=256)
+def is_commit_ref(ref: str | None, full: bool = False) -> bool:
+    """
+    True if ref looks like a commit hash rather than a branch or tag name.
+    Abbreviated hashes are ambiguous with hex-looking branch names, so
+    anything that treats the ref as immutable must pass full=True, which
+    only accepts an unabbreviated 40-char SHA-1.
+    """
+    if not ref or (full and len(ref) != 40):
+        return False
+    return _COMMIT_REF_RE.fullmatch(ref) is not None
+
+
+def file_skipped_notice(file_path: str, ref: str) -> str:
+    """Agent-facing note returned in place of a file missing at ref."""
+    return (
+        f"[FILE SKIPPED: '{file_path}' does not exist at ref '{ref}'. "
+        f"Possible reasons: file was deleted, renamed (check 'old_filename' "
+        f"in the diff manifest for the new path), or is a binary file. "
+        f"Continue reviewing the remaining files.]"
+    )
+
+
+@lru_cache(maxsize=256)
+def _is_valid_slug(value: str) -> bool:
+    """Memoized slug check — sessions reuse the same workspace/repo pair."""
+    return _SLUG_RE.match(value) is not None
+
 
 def _validate_slug(value: str, field_name: str) -> str:
     """
     Validate that a value is a safe Bitbucket slug.
     Prevents path traversal and injection attacks.
     """
-    if not re.match(r"^[a-zA-Z0-9._-]+$", value):
+    if not _is_valid_slug(value):
         raise ValueError(
             f"Invalid {field_name}: '{value}'. "
             "Only alphanumeric, dots, hyphens, and underscores allowed."
@@ -38,15 +114,133 @@ def _sanitize_text(value: str) -> str:
     responses using Windows-style CRLF line endings. These encode as
     %0D in URLs and cause malformed redirect targets.
     """
-    return value.replace("\r", "").strip()
+    # Most responses have no CRs — skip the full-copy replace for them
+    if "\r" in value:
+        value = value.replace("\r", "")
+    return value.strip()
 
 
-def _parse_diff_into_files(raw_diff: str) -> list[dict]:
+class _DiffSection:
+    """
+    One file's section of a unified diff, classified and counted line by
+    line as it streams in. Its text is only kept while it is still small
+    enough to inline, so a multi-MB section costs no more than its counts.
+    """
+
+    __slots__ = (
+        "old_path",
+        "new_path",
+        "lines",
+        "size",
+        "trailing_ws",
+        "additions",
+        "deletions",
+        "header_lines",
+        "is_added",
+        "is_deleted",
+        "is_binary",
+    )
+
+    def __init__(self, old_path: str, new_path: str):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.lines: list[str] | None = []
+        self.size = 0
+        # Length of the trailing whitespace run, stripped from the last file
+        self.trailing_ws = 0
+        self.additions = self.deletions = 0
+        self.header_lines = _DIFF_HEADER_MAX_LINES
+        self.is_added = self.is_deleted = self.is_binary = False
+
+    @classmethod
+    def start(cls, header: str) -> "_DiffSection | None":
+        """Open a section from its "diff --git a/<old> b/<new>" line."""
+        if not header.startswith(_DIFF_HEADER_PREFIX):
+            return None
+        paths = header[len(_DIFF_HEADER_PREFIX) :]
+        sep = paths.find(" b/", 1)
+        if sep < 0 or not paths[sep + 3 :]:
+            return None
+        return cls(paths[:sep], paths[sep + 3 :])
+
+    def add_line(self, line: str) -> None:
+        # Change-type markers only ever appear in git's extended header,
+        # so they are only checked until the first hunk
+        if line.startswith("+"):
+            # "+++ b/<path>" is a file header, not an added line
+            if not line.startswith("+++"):
+                self.additions += 1
+        elif line.startswith("-"):
+            if line.startswith("---"):
+                self.header_lines = 0
+            else:
+                self.deletions += 1
+        elif self.header_lines:
+            self.header_lines -= 1
+            if line.startswith("@@"):
+                self.header_lines = 0
+            elif line.startswith("new file mode"):
+                self.is_added = True
+            elif line.startswith("deleted file mode"):
+                self.is_deleted = True
+            elif line.startswith(("Binary files", "GIT binary patch")):
+                self.is_binary = True
+                self.header_lines = 0
+
+        self.size += len(line) + 1
+        stripped = len(line.rstrip())
+        if stripped:
+            self.trailing_ws = len(line) - stripped + 1
+        else:
+            self.trailing_ws += len(line) + 1
+        if self.lines is not None:
+            if self.size - self.trailing_ws < _INLINE_DIFF_MAX:
+                self.lines.append(line)
+            else:
+                self.lines = None  # too large to inline — counts only
+
+    def entry(self, last: bool) -> dict:
+        """The manifest entry; the diff's last file loses trailing whitespace."""
+        if self.is_added:
+            change_type = "added"
+        elif self.is_deleted:
+            change_type = "deleted"
+        elif self.is_binary:
+            change_type = "binary"
+        elif self.old_path != self.new_path:
+            change_type = "renamed"
+        else:
+            change_type = "modified"
+
+        size = self.size - self.trailing_ws if last else self.size
+        if self.lines is None or size >= _INLINE_DIFF_MAX:
+            diff = "[use get_file_content to fetch full diff]"
+        else:
+            diff = "\n".join(self.lines)
+            diff = diff.rstrip() if last else diff + "\n"
+
+        return {
+            # Always use new_path — correct after renames, same as old for others
+            "filename": self.new_path,
+            "old_filename": self.old_path if change_type == "renamed" else None,
+            "change_type": change_type,
+            "additions": self.additions,
+            "deletions": self.deletions,
+            # fetchable=false means get_file_content WILL 404 — agent must skip
+            "fetchable": change_type in ("added", "modified", "renamed"),
+            "size_chars": size,
+            # Inline diff only for small files — avoids blowing context on large ones
+            "diff": diff,
+        }
+
+
+class _DiffParser:
     """
-    Splits a unified diff into per-file sections and annotates each
-    with a change_type and fetchable flag so get_pull_request_diff
-    can guide the agent away from calling get_file_content on files
-    that don't exist at the source commit (deleted, binary, etc.).
+    Splits a unified diff into per-file entries as its text is fed in,
+    and annotates each with a change_type and fetchable flag so
+    get_pull_request_diff can guide the agent away from calling
+    get_file_content on files that don't exist at the source commit
+    (deleted, binary, etc.).
 
     change_type values:
       added    → new file, exists at source commit     → fetchable
@@ -54,57 +248,111 @@ def _parse_diff_into_files(raw_diff: str) -> list[dict]:
       renamed  → moved/renamed, use new filename       → fetchable
       deleted  → removed, does NOT exist at source     → NOT fetchable
       binary   → image/compiled artifact, not text     → NOT fetchable
+
+    Completed entries accumulate in `files`; close() adds the last one.
     """
-    file_sections = re.split(r"(?=^diff --git )", raw_diff, flags=re.MULTILINE)
-    files = []
 
-    for section in file_sections:
-        if not section.strip():
-            continue
+    __slots__ = ("files", "_section", "_tail", "_started")
+
+    def __init__(self):
+        self.files: list[dict] = []
+        self._section: _DiffSection | None = None
+        self._tail = ""  # incomplete last line of the text fed so far
+        self._started = False
+
+    def feed(self, text: str) -> None:
+        # Same cleanup _sanitize_text applies: drop CRs, strip the ends
+        if "\r" in text:
+            text = text.replace("\r", "")
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._add_line(line)
+
+    def close(self) -> list[dict]:
+        if self._tail:
+            self._add_line(self._tail)
+            self._tail = ""
+        if self._section is not None:
+            self.files.append(self._section.entry(last=True))
+            self._section = None
+        return self.files
+
+    def _add_line(self, line: str) -> None:
+        # Each file's section starts at a "diff --git " line
+        if line.startswith("diff --git "):
+            if self._section is not None:
+                self.files.append(self._section.entry(last=False))
+            self._section = _DiffSection.start(line)
+        if self._section is not None:
+            self._section.add_line(line)
 
-        header = re.match(r"diff --git a/(.+?) b/(.+)", section)
-        if not header:
-            continue
 
-        old_path = header.group(1)
-        new_path = header.group(2)
+def _parse_diff_into_files(raw_diff: str) -> list[dict]:
+    """Parse a complete unified diff into per-file entries (see _DiffParser)."""
+    parser = _DiffParser()
+    parser.feed(raw_diff)
+    return parser.close()
 
-        # Determine change type from diff header markers
-        if "new file mode" in section:
-            change_type = "added"
-        elif "deleted file mode" in section:
-            change_type = "deleted"
-        elif "Binary files" in section or "GIT binary patch" in section:
-            change_type = "binary"
-        elif old_path != new_path:
-            change_type = "renamed"
-        else:
-            change_type = "modified"
 
-        additions = max(section.count("\n+") - section.count("\n+++"), 0)
-        deletions = max(section.count("\n-") - section.count("\n---"), 0)
-
-        files.append(
-            {
-                # Always use new_path — correct after renames, same as old for others
-                "filename": new_path,
-                "old_filename": old_path if change_type == "renamed" else None,
-                "change_type": change_type,
-                "additions": additions,
-                "deletions": deletions,
-                # fetchable=false means get_file_content WILL 404 — agent must skip
-                "fetchable": change_type in ("added", "modified", "renamed"),
-                "size_chars": len(section),
-                # Inline diff only for small files — avoids blowing context on large ones
-                "diff": (
-                    section
-                    if len(section) < 8_000
-                    else "[use get_file_content to fetch full diff]"
-                ),
-            }
-        )
+def dumps_json(obj: Any) -> str:
+    """
+    Serialize to compact JSON via orjson (Rust, emits UTF-8). No indent:
+    the reader is an LLM, and whitespace would count against max_chars.
+    """
+    return orjson.dumps(obj).decode()
 
-    return files
+
+def _serialize_manifest(manifest: dict, max_chars: int) -> str:
+    """
+    Serialize the diff manifest, dropping trailing files until it fits
+    within max_chars.
+
+    Each file's contribution to the output is measured once instead of
+    re-serializing the whole manifest after every dropped file, so a
+    large PR costs O(files) serializations rather than O(files²).
+    """
+    manifest_text = dumps_json(manifest)
+    if len(manifest_text) <= max_chars:
+        return manifest_text
+
+    files = manifest["files"]
+    manifest["truncated"] = True
+    manifest["note"] += (
+        "\n\n[MANIFEST TRUNCATED — not all files shown. "
+        "Remaining files were removed to fit context limit."
+    )
+
+    # Fixed cost of everything except the file entries ("[]" included)
+    manifest["files"] = []
+    budget = max_chars - len(dumps_json(manifest))
+
+    kept = 0
+    for f in files:
+        # Compact output: each entry is its own serialization, and all
+        # but the first are preceded by ","
+        size = len(dumps_json(f)) + (1 if kept else 0)
+        if size > budget:
+            break
+        budget -= size
+        kept += 1
+
+    manifest["files"] = files[:kept]
+    return dumps_json(manifest)
+
+
+def _pr_source_ref(pr: dict) -> str:
+    """Source commit hash of a PR payload, or its branch name if absent."""
+    source = pr.get("source") or {}
+    branch = (source.get("branch") or {}).get("name") or ""
+    commit = (source.get("commit") or {}).get("hash") or ""
+    # Prefer commit hash (immutable) over branch name for precision
+    return _sanitize_text(commit or branch)
 
 
 class BitbucketClient:
@@ -115,13 +363,17 @@ class BitbucketClient:
     for all PR review operations.
     """
 
-    def __init__(self, auth: BitbucketAuth):
+    def __init__(self, auth: BitbucketAuth, http: httpx.AsyncClient | None = None):
         self.auth = auth
-        self.settings = get_settings()
-        self._http = httpx.AsyncClient(
-            base_url=self.settings.bitbucket_api_base,
-            timeout=30.0,
-        )
+        self.settings = settings
+        self._http = http or create_http_client()
+        # (workspace, repo_slug, ref, file_path) →
+        #   (content, etag | None, fresh_until | None — None means immutable)
+        self._file_cache = LRUCache(maxsize=_FILE_CACHE_SIZE)
+        # (workspace, repo_slug, pr_id) → PR source commit (or branch)
+        self._pr_ref_cache = LRUCache(maxsize=_PR_REF_CACHE_SIZE)
+        # In-flight ref lookups, so concurrent reads for one PR share a call
+        self._pr_ref_inflight: dict[tuple[str, str, int], asyncio.Task[str]] = {}
 
     async def _request(self, method: str, path: str, **kwargs) -> dict[str, Any]:
         """
@@ -169,10 +421,16 @@ class BitbucketClient:
         workspace = _validate_slug(workspace, "workspace")
         repo_slug = _validate_slug(repo_slug, "repo_slug")
 
-        return await self._request(
+        pr = await self._request(
             "GET",
             f"/repositories/{workspace}/{repo_slug}/pullrequests/{pr_id}",
         )
+        # Prime the source-ref cache: agents fetch the PR first, then read
+        # its files with pr_id, which would otherwise re-fetch the PR
+        self._pr_ref_cache.set(
+            (workspace, repo_slug, pr_id), _pr_source_ref(pr), ttl=_PR_REF_TTL
+        )
+        return pr
 
     # ── PR Diff ─────────────────────────────────────────────
 
@@ -193,33 +451,7 @@ class BitbucketClient:
         The agent MUST check fetchable=true before calling get_file_content.
         Deleted and binary files do not exist at the source commit and will 404.
         """
-        workspace = _validate_slug(workspace, "workspace")
-        repo_slug = _validate_slug(repo_slug, "repo_slug")
-
-        token = await self.auth.get_access_token()
-        response = await self._http.get(
-            f"/repositories/{workspace}/{repo_slug}" f"/pullrequests/{pr_id}/diff",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "text/plain",
-            },
-            follow_redirects=True,
-        )
-        if response.status_code == 404:
-            raise ValueError(
-                f"PR #{pr_id} diff not found in {workspace}/{repo_slug}. "
-                "Check that the PR ID is correct and the PR is open."
-            )
-        if response.status_code == 403:
-            raise PermissionError(
-                "Insufficient permissions to read diff. "
-                "Ensure your OAuth token has 'pullrequest' read scope."
-            )
-
-        response.raise_for_status()
-
-        diff_text = _sanitize_text(response.text)
-        files = _parse_diff_into_files(diff_text)
+        files, capped = await self.get_pull_request_files(workspace, repo_slug, pr_id)
 
         manifest = {
             "total_files_changed": len(files),
@@ -231,21 +463,79 @@ class BitbucketClient:
             ),
             "files": files,
         }
-
-        # Truncate very large diffs to avoid LLM context overflow
-        max_chars = settings.max_chars
-        manifest_text = json.dumps(manifest, indent=2)
-        if len(manifest_text) > max_chars:
-            while len(json.dumps(manifest, indent=2)) > max_chars and manifest["files"]:
-                manifest["files"].pop()
+        if capped:
             manifest["truncated"] = True
             manifest["note"] += (
-                "\n\n[MANIFEST TRUNCATED — not all files shown. "
-                "Remaining files were removed to fit context limit."
+                "\n\n[DIFF TRUNCATED — the PR diff is too large to list in full. "
+                "Files after the last one listed were not read.]"
             )
-            manifest_text = json.dumps(manifest, indent=2)
 
-        return manifest_text
+        # Truncate very large diffs to avoid LLM context overflow
+        return _serialize_manifest(manifest, settings.max_chars)
+
+    async def get_pull_request_files(
+        self, workspace: str, repo_slug: str, pr_id: int
+    ) -> tuple[list[dict], bool]:
+        """
+        Fetch and parse a pull request's diff into per-file entries.
+
+        Returns the file entries (see get_pull_request_diff) and whether
+        reading stopped early, in which case later files are missing.
+        """
+        workspace = _validate_slug(workspace, "workspace")
+        repo_slug = _validate_slug(repo_slug, "repo_slug")
+
+        # Stream the body through an incremental parser, keeping only the
+        # manifest entries, and stop reading once they no longer fit in
+        # max_chars — the manifest could not list anything past that point
+        parser = _DiffParser()
+        listed_chars = 0
+        capped = False
+
+        token = await self.auth.get_access_token()
+        async with self._http.stream(
+            "GET",
+            f"/repositories/{workspace}/{repo_slug}" f"/pullrequests/{pr_id}/diff",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Accept": "text/plain",
+            },
+            follow_redirects=True,
+        ) as response:
+            if response.status_code == 404:
+                raise ValueError(
+                    f"PR #{pr_id} diff not found in {workspace}/{repo_slug}. "
+                    "Check that the PR ID is correct and the PR is open."
+                )
+            if response.status_code == 403:
+                raise PermissionError(
+                    "Insufficient permissions to read diff. "
+                    "Ensure your OAuth token has 'pullrequest' read scope."
+                )
+
+            response.raise_for_status()
+
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+                errors="replace"
+            )
+            chunks = response.aiter_bytes(65_536)
+            async for chunk in chunks:
+                listed = len(parser.files)
+                parser.feed(decoder.decode(chunk))
+                # Compact JSON size of the new entries, each after a ","
+                for f in parser.files[listed:]:
+                    listed_chars += len(dumps_json(f)) + 1
+                if listed_chars > settings.max_chars:
+                    # Only truncated if unread bytes remain; otherwise the
+                    # file still being parsed is complete and is kept
+                    capped = await anext(chunks, None) is not None
+                    break
+
+        if capped:
+            # Drop the partially-read trailing file so its counts aren't wrong
+            return parser.files, True
+        parser.feed(decoder.decode(b"", final=True))
+        return parser.close(), False
 
     # ── PR Comments ─────────────────────────────────────────
 
@@ -280,40 +570,131 @@ class BitbucketClient:
         Fetch the content of a specific file from the repository.
 
         Useful for reading style guides, linting configs, or
-        related documentation that informs the review.
+        related documentation that informs the review. A file missing
+        at ref yields a skip notice for the agent instead of an error.
+        """
+        content = await self.find_file_content(workspace, repo_slug, file_path, ref)
+        if content is None:
+            return file_skipped_notice(file_path, ref)
+        return content
+
+    async def find_file_content(
+        self,
+        workspace: str,
+        repo_slug: str,
+        file_path: str,
+        ref: str = "main",
+    ) -> str | None:
+        """
+        Like get_file_content, but returns None when the file does not
+        exist at ref, so callers can tell a skip from real content.
         """
         workspace = _validate_slug(workspace, "workspace")
         repo_slug = _validate_slug(repo_slug, "repo_slug")
 
+        cache_key = (workspace, repo_slug, ref, file_path)
+        cached = self._file_cache.get(cache_key)
+        headers = {}
+        if cached is not None:
+            content, etag, fresh_until = cached
+            if fresh_until is None or time.monotonic() < fresh_until:
+                return content
+            if etag:
+                # Stale branch entry — ask Bitbucket whether it changed
+                headers["If-None-Match"] = etag
+
         token = await self.auth.get_access_token()
         # URL-encode the ref to safely handle branch names containing '/'
-        # e.g. 'feature/hello-world' → 'feature%2Fhello-world'
-        encoded_ref = quote(ref, safe="")
+        # e.g. 'feature/hello-world' → 'feature%2Fhello-world'.
+        # The file path keeps its '/' separators but escapes anything else
+        # ('#', '?', spaces) that would otherwise be parsed as URL syntax.
+        url_path = (
+            f"/repositories/{workspace}/{repo_slug}/src/"
+            f"{quote(ref, safe='')}/{quote(file_path, safe='/')}"
+        )
 
         response = await self._http.get(
-            f"/repositories/{workspace}/{repo_slug}/src/{encoded_ref}/{file_path}",
-            headers={"Authorization": f"Bearer {token}"},
+            url_path,
+            headers={"Authorization": f"Bearer {token}", **headers},
             follow_redirects=True,
         )
+        if response.status_code == 304:
+            # Unchanged since last fetch — no body sent, keep the cached one
+            self._file_cache.set(
+                cache_key, (content, etag, time.monotonic() + _BRANCH_FILE_TTL)
+            )
+            return content
         if response.status_code == 404:
             logger.warning(
-                f"File '{file_path}' not found at ref='{ref}' "
-                f"in {workspace}/{repo_slug}. "
+                "File '%s' not found at ref='%s' in %s/%s. "
                 "Verify the branch name and file path from the PR diff. "
-                "Likely delted, renamed, or binary."
-            )
-            return (
-                f"[FILE SKIPPED: '{file_path}' does not exist at ref '{ref}'. "
-                f"Possible reasons: file was deleted, renamed (check 'old_filename' "
-                f"in the diff manifest for the new path), or is a binary file. "
-                f"Continue reviewing the remaining files.]"
+                "Likely deleted, renamed, or binary.",
+                file_path,
+                ref,
+                workspace,
+                repo_slug,
             )
+            return None
         if response.status_code == 403:
             raise PermissionError(
                 f"Cannot read '{file_path}' — check repository read permissions."
             )
         response.raise_for_status()
-        return response.text
+
+        content = response.text
+        self._file_cache.set(
+            cache_key,
+            (
+                content,
+                response.headers.get("ETag"),
+                # Only a full hash is certain to name one commit; shorter
+                # hashes and hex-looking branch names are revalidated
+                (
+                    None
+                    if is_commit_ref(ref, full=True)
+                    else time.monotonic() + _BRANCH_FILE_TTL
+                ),
+            ),
+        )
+        return content
+
+    async def get_file_contents(
+        self,
+        workspace: str,
+        repo_slug: str,
+        file_paths: list[str],
+        ref: str = "main",
+        concurrency: int = 10,
+    ) -> dict[str, str | None | Exception]:
+        """
+        Fetch several files concurrently at the same ref.
+
+        Requests share the pooled HTTP client; the semaphore caps how
+        many are in flight at once. Returns a mapping of file path to
+        content, in the order the paths were given. A file missing at
+        ref maps to None and a failed read to its exception, so one bad
+        file doesn't sink the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_one(file_path: str) -> tuple[str, str | None | Exception]:
+            async with semaphore:
+                try:
+                    content = await self.find_file_content(
+                        workspace, repo_slug, file_path, ref
+                    )
+                except (httpx.HTTPError, PermissionError) as e:
+                    logger.warning("Could not read '%s' at '%s': %s", file_path, ref, e)
+                    return file_path, e
+                return file_path, content
+
+        return dict(await asyncio.gather(*(fetch_one(p) for p in file_paths)))
+
+    def invalidate_pull_request(
+        self, workspace: str, repo_slug: str, pr_id: int
+    ) -> None:
+        """Drop cached data for a PR; call after any write to it."""
+        self._pr_ref_cache.pop((workspace, repo_slug, pr_id))
 
     # ── Helper: Get PR source branch ref ────────────────────────────────────
     async def get_pr_source_ref(
@@ -322,12 +703,33 @@ class BitbucketClient:
         """
         Returns the source branch name of a PR.
         Use this ref when calling get_file_content for files changed in the PR.
+
+        Cached for _PR_REF_TTL seconds; concurrent callers asking for the
+        same PR share one in-flight lookup.
         """
+        key = (workspace, repo_slug, pr_id)
+        ref = self._pr_ref_cache.get(key)
+        if ref is not None:
+            return ref
+
+        task = self._pr_ref_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch_pr_source_ref(workspace, repo_slug, pr_id)
+            )
+            self._pr_ref_inflight[key] = task
+            task.add_done_callback(lambda _: self._pr_ref_inflight.pop(key, None))
+        # Shield so one caller being cancelled doesn't cancel the shared lookup
+        ref = await asyncio.shield(task)
+        self._pr_ref_cache.set(key, ref, ttl=_PR_REF_TTL)
+        return ref
+
+    async def _fetch_pr_source_ref(
+        self, workspace: str, repo_slug: str, pr_id: int
+    ) -> str:
+        """Look up a PR's source ref from Bitbucket (uncached)."""
         pr = await self.get_pull_request(workspace, repo_slug, pr_id)
-        branch = pr.get("source", {}).get("branch", {}).get("name", "")
-        commit = pr.get("source", {}).get("commit", {}).get("hash", "")
-        # Prefer commit hash (immutable) over branch name for precision
-        return _sanitize_text(commit or branch)
+        return _pr_source_ref(pr)
 
     async def close(self):
         """Cleanup HTTP clients."""
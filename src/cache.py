@@ -0,0 +1,78 @@
+"""
+Small in-process caches.
+
+Bounded LRU with optional per-entry TTL, used to skip repeat Bitbucket
+round-trips for data that does not change within a review session.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Size-bounded LRU map with optional per-entry TTL.
+
+    Expiry uses time.monotonic(), so wall-clock jumps never extend or
+    cut short an entry's lifetime. Entries without a TTL live until
+    evicted by size. All operations are O(1).
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        # key → (expires_at | None, value), least recently used first
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (marking it recently used), or default."""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value, or default if absent/expired."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        del self._data[key]
+        return value
+
+    def purge_expired(self) -> int:
+        """
+        Drop every expired entry and return how many were removed.
+
+        O(n) — meant for periodic background sweeps, not the request path.
+        get() already discards an expired entry lazily when it is read.
+        """
+        now = time.monotonic()
+        expired = [
+            key
+            for key, (expires_at, _) in self._data.items()
+            if expires_at is not None and now >= expires_at
+        ]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
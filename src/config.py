@@ -20,10 +20,12 @@ class Settings(BaseSettings):
     mcp_server_host: str = "0.0.0.0"
     mcp_server_port: int = 8080
     mcp_server_name: str = "bitbucket-pr-review"
+    mcp_tool_groups: str = ""  # e.g. "read,comment"; empty exposes all tools
 
     # Inbound authentication (clients -> this server)
     auth_mode: str = "none"  # "none" or "glean_only"
     glean_instance: str = ""  # Required if auth_mode = "glean_only"
+    redis_url: str = ""  # Optional: share validated tokens across instances
 
     # Security
     allowed_origins: str = ""
@@ -33,8 +35,10 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+        # Read once per process (get_settings is cached) and never mutated
+        frozen = True
 
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
@@ -8,17 +8,103 @@ Three validation checks:
 3. Request must come from the allowed Glean instance
 """
 
-import time
+import asyncio
+import base64
 import hashlib
-import json
 import logging
+import re
+import time
 import httpx
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from starlette.requests import Request
-from starlette.types import ASGIApp, Scope, Receive, Send
+from starlette.types import ASGIApp, Message, Scope, Receive, Send
+from src.cache import LRUCache
 from src.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Validated tokens are trusted for this long before re-checking Bitbucket
+_TOKEN_CACHE_TTL = 300
+_TOKEN_CACHE_SIZE = 500
+
+# With a shared Redis cache, local entries are only a short-lived L1 so a
+# revocation (Redis DEL) takes effect quickly on every instance
+_LOCAL_TTL_WITH_REDIS = 30
+_REDIS_KEY_PREFIX = b"bitbucket-mcp:token:"
+# How often the background janitor sweeps expired tokens from the local cache
+_JANITOR_INTERVAL = 60
+
+# Shared pooled client for token validation — one keep-alive (HTTP/2)
+# connection to api.bitbucket.org instead of one pool per middleware.
+# Created lazily inside the running event loop; closed on app shutdown.
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide validation HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=60,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared validation HTTP client (called from the app lifespan)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Optional shared token cache across instances (REDIS_URL). None when unset.
+_redis_client: Redis | None = None
+
+
+def get_redis_client() -> Redis | None:
+    """Return the shared Redis client, or None if no REDIS_URL is configured."""
+    global _redis_client
+    redis_url = get_settings().redis_url
+    if _redis_client is None and redis_url:
+        _redis_client = Redis.from_url(redis_url, socket_timeout=1.0)
+    return _redis_client
+
+
+async def close_redis_client() -> None:
+    """Close the shared Redis client (called from the app lifespan)."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+
+def _jwt_expiry(token: str) -> float | None:
+    """
+    Return the `exp` claim (Unix time) if the token is a JWT, else None.
+
+    The signature is NOT verified — Bitbucket publishes no JWKS for its
+    OAuth tokens, so this is only ever used to reject or shorten trust,
+    never to accept a token without the live /user check.
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4))
+        exp = orjson.loads(payload).get("exp")
+    except Exception:
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
 
 class GleanAuthMiddleware:
     """
@@ -31,22 +117,80 @@ class GleanAuthMiddleware:
     #   /health  → Cloud Run / load balancer health checks
     #   /sse     → SSE handshake (tool discovery ListToolsRequest comes here)
     #   OPTIONS  → CORS preflight
-    SKIP_PATHS = {"/health", "/sse"}
+    SKIP_PATHS = frozenset({"/health", "/sse"})
+
+    __slots__ = (
+        "app",
+        "settings",
+        "_auth_mode",
+        "_glean_instance",
+        "_validated_tokens",
+        "_local_ttl",
+        "_rejections",
+        "_inflight",
+        "_janitor",
+        "_allowed_glean_host",
+        "_allowed_hosts",
+        "_allowed_host_re",
+    )
 
     def __init__(self, app: ASGIApp) -> None:
         self.app = app
         self.settings = get_settings()
-        self._http = httpx.AsyncClient(timeout=10.0)
+        # Settings are frozen, so bind the per-request values once
+        self._auth_mode = self.settings.auth_mode
+        self._glean_instance = self.settings.glean_instance
+
+        # Token validation cache: bounded LRU of tokens with a TTL, so hits,
+        # inserts and evictions are all O(1). The token itself is the key —
+        # dict lookup already hashes it once, so a separate SHA-256 per
+        # request was redundant work.
+        # NOTE: per-instance cache. For multi-instance deployments set
+        # REDIS_URL — validations are then shared through Redis and this
+        # becomes a short-lived L1 in front of it.
+        self._validated_tokens = LRUCache(maxsize=_TOKEN_CACHE_SIZE)
+        self._local_ttl = (
+            _LOCAL_TTL_WITH_REDIS if self.settings.redis_url else _TOKEN_CACHE_TTL
+        )
+
+        # Constant rejection responses, encoded once. Only the origin
+        # rejection echoes request headers, so it is still built per call.
+        self._rejections = {
+            "no_bearer": self._json_messages(401, {"error": "Bearer token required"}),
+            "bad_format": self._json_messages(401, {"error": "Invalid token format"}),
+            "invalid_token": self._json_messages(
+                403, {"error": "Invalid or expired token"}
+            ),
+        }
+
+        # In-flight validations: token → shared Bitbucket /user check, so a
+        # burst of requests with the same uncached token makes one call
+        self._inflight: dict[str, asyncio.Task[bool]] = {}
 
-        # Token validation cache: sha256(token)[:16] → expiry timestamp
-        # NOTE: per-instance cache. Acceptable for Cloud Run single-instance
-        # dev/demo deployments. For multi-instance prod, use Redis or similar.
-        self._validated_tokens: dict[str, float] = {}
+        # Background sweep of expired cache entries, started on the first
+        # request (no event loop exists yet at construction time)
+        self._janitor: asyncio.Task | None = None
 
         # Allowed Glean backend host for origin heuristic checks
         self._allowed_glean_host = (
-            f"{self.settings.glean_instance}-be.glean.com"
-            if self.settings.glean_instance
+            f"{self._glean_instance}-be.glean.com" if self._glean_instance else None
+        )
+
+        # Both frontend and backend hosts, built once rather than per request:
+        #   support-lab-be.glean.com  (backend)
+        #   support-lab.glean.com     (Agent Builder UI)
+        self._allowed_hosts: tuple[str, ...] = (
+            (
+                self._allowed_glean_host,
+                f"{self._glean_instance}.glean.com",
+            )
+            if self._glean_instance
+            else ()
+        )
+        # One compiled alternation replaces a substring scan per host
+        self._allowed_host_re = (
+            re.compile("|".join(map(re.escape, self._allowed_hosts)))
+            if self._allowed_hosts
             else None
         )
 
@@ -56,81 +200,84 @@ class GleanAuthMiddleware:
         WebSocket and lifespan scopes are passed straight through
         without any response wrapping.
         """
+        if scope["type"] == "lifespan":
+            # Stop the janitor when the server begins shutting down
+            async def receive_lifespan() -> Message:
+                message = await receive()
+                if message["type"] == "lifespan.shutdown":
+                    self._stop_janitor()
+                return message
+
+            await self.app(scope, receive_lifespan, send)
+            return
+
         if scope["type"] != "http":
-            # Pass WebSocket / lifespan scopes through untouched
+            # Pass WebSocket scopes through untouched
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive)
-
         # ── Skip auth for health checks, SSE, and CORS preflight ──────────
-        if request.url.path in self.SKIP_PATHS or request.method == "OPTIONS":
+        # Read straight from the scope — no Request allocation on this path
+        if scope["path"] in self.SKIP_PATHS or scope["method"] == "OPTIONS":
             await self.app(scope, receive, send)
             return
 
-        # ── Development mode — bypass all auth ────────────────────────────
-        if self.settings.auth_mode == "none":
-            await self.app(scope, receive, send)
-            return
+        if self._janitor is None:
+            self._janitor = asyncio.create_task(self._sweep_token_cache())
+
+        request = Request(scope, receive)
 
         # ── Check 1: Bearer token present ─────────────────────────────────
+        # Split scheme and token with two slices; no separate prefix scan
         auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
+        scheme, token = auth_header[:7], auth_header[7:]
+        if scheme != "Bearer ":
             logger.warning(
-                f"Rejected (no Bearer token): {request.client.host} "
-                f"→ {request.method} {request.url.path}"
-            )
-            await self._send_json_response(
-                send, status=401, body={"error": "Bearer token required"}
+                "Rejected (no Bearer token): %s -> %s %s",
+                request.client.host,
+                request.method,
+                request.url.path,
             )
+            await self._send_rejection(send, "no_bearer")
             return
 
-        token = auth_header[7:]
-
         # ── Check 2: Token not empty/malformed ────────────────────────────
         if len(token) < 10:
-            await self._send_json_response(
-                send, status=401, body={"error": "Invalid token format"}
-            )
+            await self._send_rejection(send, "bad_format")
             return
 
         # ── Check 3: Token validation (with cache) ────────────────────────
-        token_hash = hashlib.sha256(token.encode()).hexdigest()[:32]
-        now = time.time()
-
-        if token_hash in self._validated_tokens:
-            if now < self._validated_tokens[token_hash]:
-                pass  # cache hit — skip Bitbucket API call
-            else:
-                del self._validated_tokens[token_hash]
-                if not await self._validate_token(token):
-                    logger.warning(f"Rejected (expired token): {request.client.host}")
-                    await self._send_json_response(
-                        send, status=403, body={"error": "Invalid or expired token"}
-                    )
+        if token not in self._validated_tokens:
+            # JWT-shaped tokens carry their own expiry: an expired one is
+            # rejected locally without a Bitbucket round trip.
+            expires_at = _jwt_expiry(token)
+            ttl = float(_TOKEN_CACHE_TTL)
+            if expires_at is not None:
+                ttl = min(ttl, expires_at - time.time())
+                if ttl <= 0:
+                    logger.warning("Rejected (expired JWT): %s", request.client.host)
+                    await self._send_rejection(send, "invalid_token")
                     return
-                self._validated_tokens[token_hash] = now + 300
-        else:
-            # Cache miss — validate live against Bitbucket
-            if not await self._validate_token(token):
-                logger.warning(f"Rejected (invalid token): {request.client.host}")
-                await self._send_json_response(
-                    send, status=403, body={"error": "Invalid or expired token"}
+
+            # Cache miss or expired entry — validate live against Bitbucket
+            if not await self._validate_token_once(token, ttl):
+                logger.warning(
+                    "Rejected (invalid or expired token): %s", request.client.host
                 )
+                await self._send_rejection(send, "invalid_token")
                 return
-            self._validated_tokens[token_hash] = now + 300
-
-        self._cleanup_cache()
+            self._validated_tokens.set(token, True, ttl=min(ttl, self._local_ttl))
 
         # ── Check 4: Origin heuristics (glean_only mode) ──────────────────
-        if self.settings.auth_mode == "glean_only":
+        if self._auth_mode == "glean_only":
             if not self._check_request_origin(request):
                 logger.warning(
-                    f"Rejected (origin check failed): "
-                    f"client={request.client.host}, "
-                    f"user-agent={request.headers.get('user-agent')}, "
-                    f"origin={request.headers.get('origin')}, "
-                    f"referer={request.headers.get('referer')}"
+                    "Rejected (origin check failed): "
+                    "client=%s, user-agent=%s, origin=%s, referer=%s",
+                    request.client.host,
+                    request.headers.get("user-agent"),
+                    request.headers.get("origin"),
+                    request.headers.get("referer"),
                 )
                 await self._send_json_response(
                     send,
@@ -160,72 +307,133 @@ class GleanAuthMiddleware:
         - support-lab.glean.com     → Browser frontend (Agent Builder UI
                                         tool saving/validation)
         """
-        user_agent = request.headers.get("user-agent", "")
-        origin = request.headers.get("origin", "")
-        referer = request.headers.get("referer", "")
+        headers = request.headers
+        user_agent = headers.get("user-agent", "")
+        origin = headers.get("origin", "")
+        referer = headers.get("referer", "")
+        method = request.method
+        path = request.url.path
 
         # ── User-Agent: advisory signal only ─────────────────────────────────
         # Log unexpected UAs for visibility but do NOT block on them.
         if "Glean-MCP-Client" in user_agent or "Go-http-client" in user_agent:
             logger.info(
-                f"ORIGIN_DIAGNOSTIC | PASS (Go-http-client backend) | "
-                f"method={request.method} path={request.url.path}"
-                f"origin='{origin or 'NOT SET'}' | "
-                f"referer='{referer or 'NOT SET'}'"
+                "ORIGIN_DIAGNOSTIC | PASS (Go-http-client backend) | "
+                "method=%s path=%s | origin='%s' | referer='%s'",
+                method,
+                path,
+                origin or "NOT SET",
+                referer or "NOT SET",
             )
             return True
 
         # Log the UA for visibility — not a block condition.
         logger.info(
-            f"Non-Go-http-client UA (allowed): '{user_agent}' "
-            f"from {request.client.host} "
-            f"→ {request.method} {request.url.path}"
+            "Non-Go-http-client UA (allowed): '%s' from %s -> %s %s",
+            user_agent,
+            request.client.host,
+            method,
+            path,
         )
 
-        # ── Build allowed host list: both frontend and backend ────────────────
-        # self._allowed_glean_host = "support-lab-be.glean.com"  (backend)
-        # frontend host            = "support-lab.glean.com"     (Agent Builder UI)
-        allowed_hosts = []
-        if self._allowed_glean_host:
-            # support-lab-be.glean.com
-            allowed_hosts.append(self._allowed_glean_host)
-        if self.settings.glean_instance:
-            # support-lab.glean.com
-            allowed_hosts.append(f"{self.settings.glean_instance}.glean.com")
+        allowed_hosts = self._allowed_hosts
+        host_re = self._allowed_host_re
 
         # ── Origin header: hard check only if present ─────────────────────────
-        if origin and allowed_hosts:
-            if not any(host in origin for host in allowed_hosts):
-                logger.warning(f"Origin mismatch: '{origin}' not in {allowed_hosts}")
+        if origin and host_re:
+            if not host_re.search(origin):
+                logger.warning("Origin mismatch: '%s' not in %s", origin, allowed_hosts)
                 return False
 
         # ── Referer header: hard check only if present ────────────────────────
-        if referer and allowed_hosts:
-            if not any(host in referer for host in allowed_hosts):
-                logger.warning(f"Referer mismatch: '{referer}' not in {allowed_hosts}")
+        if referer and host_re:
+            if not host_re.search(referer):
+                logger.warning(
+                    "Referer mismatch: '%s' not in %s", referer, allowed_hosts
+                )
                 return False
 
         logger.info(
-            f"ORIGIN_DIAGNOSTIC | "
-            f"method={request.method} path={request.url.path} | "
-            f"origin='{origin or 'NOT SET'}' | "
-            f"referer='{referer or 'NOT SET'}' | "
-            f"user-agent='{user_agent[:80]}' | "
-            f"allowed_hosts={allowed_hosts} | "
-            f"result=PASS"
+            "ORIGIN_DIAGNOSTIC | method=%s path=%s | origin='%s' | "
+            "referer='%s' | user-agent='%s' | allowed_hosts=%s | result=PASS",
+            method,
+            path,
+            origin or "NOT SET",
+            referer or "NOT SET",
+            user_agent[:80],
+            list(allowed_hosts),
         )
 
         return True
 
+    # ── Token Cache Maintenance ────────────────────────────────────────────
+
+    async def _sweep_token_cache(self) -> None:
+        """Periodically evict expired tokens, off the request path."""
+        while True:
+            await asyncio.sleep(_JANITOR_INTERVAL)
+            purged = self._validated_tokens.purge_expired()
+            if purged:
+                logger.debug("Purged %d expired tokens from cache", purged)
+
+    def _stop_janitor(self) -> None:
+        """Cancel the background sweep (called on lifespan shutdown)."""
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+
     # ── Token Validation ───────────────────────────────────────────────────
 
+    async def _validate_token_once(self, token: str, ttl: float) -> bool:
+        """
+        Validate a token, sharing a single in-flight check (shared cache
+        lookup + Bitbucket call) between all concurrent requests that
+        present the same uncached token.
+        """
+        task = self._inflight.get(token)
+        if task is None:
+            task = asyncio.create_task(self._validate_token_shared(token, ttl))
+            self._inflight[token] = task
+            task.add_done_callback(lambda _: self._inflight.pop(token, None))
+        # Shield so one client disconnecting doesn't cancel the shared check
+        return await asyncio.shield(task)
+
+    async def _validate_token_shared(self, token: str, ttl: float) -> bool:
+        """
+        Consult the shared Redis cache (if configured) before validating
+        live, and record successful validations there for ttl seconds.
+        Redis failures degrade to the live check — never to a rejection.
+        """
+        redis = get_redis_client()
+        if redis is None:
+            return await self._validate_token(token)
+
+        # Raw 16-byte digest — Redis keys are binary-safe, so no hex step
+        key = (
+            _REDIS_KEY_PREFIX + hashlib.blake2b(token.encode(), digest_size=16).digest()
+        )
+        try:
+            if await redis.exists(key):
+                return True
+        except (RedisError, OSError) as e:
+            logger.warning("Shared token cache unavailable: %s", e)
+
+        if not await self._validate_token(token):
+            return False
+
+        try:
+            await redis.set(key, 1, ex=max(int(ttl), 1), nx=True)
+        except (RedisError, OSError) as e:
+            logger.warning("Could not record token in shared cache: %s", e)
+        return True
+
     async def _validate_token(self, token: str) -> bool:
         """
         Validate the OAuth token by calling Bitbucket's /user endpoint.
         Returns True if the token is valid, False otherwise.
         """
         try:
-            response = await self._http.get(
+            response = await get_http_client().get(
                 "https://api.bitbucket.org/2.0/user",
                 headers={
                     "Authorization": f"Bearer {token}",
@@ -235,50 +443,57 @@ class GleanAuthMiddleware:
             if response.status_code == 200:
                 user_data = response.json()
                 logger.info(
-                    f"Token validated for Bitbucket user: "
-                    f"{user_data.get('display_name', 'unknown')}"
+                    "Token validated for Bitbucket user: %s",
+                    user_data.get("display_name", "unknown"),
                 )
                 return True
-            logger.info(f"Token validation failed: HTTP {response.status_code}")
+            logger.info("Token validation failed: HTTP %s", response.status_code)
             return False
         except Exception:
             logger.exception("Error during token validation against Bitbucket")
             return False
 
-    # ── ASGI Response Helper ───────────────────────────────────────────────
+    # ── ASGI Response Helpers ──────────────────────────────────────────────
 
     @staticmethod
-    async def _send_json_response(send: Send, status: int, body: dict) -> None:
+    def _json_messages(status: int, body: dict) -> tuple[dict, dict]:
         """
-        Send a minimal JSON HTTP response directly via the ASGI send callable.
-        Used to reject requests before they reach the application.
-        Safe to use in pure ASGI middleware — no response buffering.
+        Encode a JSON response as its two ASGI messages
+        (http.response.start + http.response.body).
         """
-        body_bytes = json.dumps(body).encode("utf-8")
-        await send(
+        body_bytes = orjson.dumps(body)
+        return (
             {
                 "type": "http.response.start",
                 "status": status,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body_bytes)).encode()],
-                ],
-            }
-        )
-        await send(
+                # Immutable: pre-encoded rejections are reused across requests
+                "headers": (
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body_bytes)).encode()),
+                ),
+            },
             {
                 "type": "http.response.body",
                 "body": body_bytes,
                 "more_body": False,
-            }
+            },
         )
 
-    # ── Cache Maintenance ──────────────────────────────────────────────────
+    async def _send_rejection(self, send: Send, reason: str) -> None:
+        """Send one of the pre-encoded constant rejection responses."""
+        start, body = self._rejections[reason]
+        # Send copies — outer middleware (e.g. CORS) may rewrite a message's
+        # headers in place, which must not leak into later rejections
+        await send(dict(start))
+        await send(dict(body))
 
-    def _cleanup_cache(self) -> None:
-        """Evict expired entries when cache grows large."""
-        if len(self._validated_tokens) > 500:
-            now = time.time()
-            self._validated_tokens = {
-                k: v for k, v in self._validated_tokens.items() if v > now
-            }
+    @classmethod
+    async def _send_json_response(cls, send: Send, status: int, body: dict) -> None:
+        """
+        Send a minimal JSON HTTP response directly via the ASGI send callable.
+        Used to reject requests before they reach the application.
+        Safe to use in pure ASGI middleware — no response buffering.
+        """
+        start, body_msg = cls._json_messages(status, body)
+        await send(start)
+        await send(body_msg)
@@ -10,19 +10,24 @@ Transport options:
 """
 
 import logging
+from contextlib import asynccontextmanager
+import orjson
 import uvicorn
 from starlette.applications import Starlette
-from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import Response
 from starlette.routing import Route, Mount
-from starlette.types import Scope, Receive, Send
+from starlette.types import ASGIApp, Scope, Receive, Send
 from mcp.server.sse import SseServerTransport
 
-from src.tools import create_mcp_server
+from src.tools import create_bitbucket_client, create_mcp_server
 from src.config import get_settings
-from src.middleware import GleanAuthMiddleware
+from src.middleware import (
+    GleanAuthMiddleware,
+    close_http_client,
+    close_redis_client,
+)
 
 settings = get_settings()
 
@@ -33,39 +38,50 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class _NoopResponse(Response):
+class _ASGIEndpoint:
     """
-    A response that intentionally does nothing when Starlette calls it.
+    Wraps an `async (scope, receive, send)` function so Starlette routes to
+    it as a raw ASGI app.
 
     WHY THIS EXISTS:
-    Starlette's route machinery always calls `await response(scope, receive, send)`
-    on whatever the handler returns. For SSE and POST /messages/ endpoints,
-    the MCP transport (SseServerTransport) has ALREADY sent the full HTTP response
-    via the `send` callable before the handler returns. If Starlette then tries
-    to send another `http.response.start`, Uvicorn raises:
+    Starlette treats any plain function endpoint as `func(request) -> response`:
+    it builds a Request for the handler and then awaits the returned response.
+    For SSE and POST /messages/ the MCP transport (SseServerTransport) sends
+    the full HTTP response itself via `send`, so neither the Request nor a
+    response object is wanted. Starlette only passes class instances through
+    untouched, hence this thin wrapper.
+    """
 
-      RuntimeError: Unexpected ASGI message 'http.response.start'
-                    sent, after response already completed.
+    __slots__ = ("_handler",)
 
-    This class suppresses that second send, letting the SSE transport
-    fully own the response lifecycle.
-    """
+    def __init__(self, handler):
+        self._handler = handler
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
-        pass  # SSE/message transport already completed the response — do nothing
+        await self._handler(scope, receive, send)
+
+
+# Paths only ever hit by non-browser clients (probes), which skip CORS
+_NO_CORS_PATHS = frozenset({"/health"})
 
 
-def create_app() -> Starlette:
+def _client_host(scope: Scope) -> str:
+    """Peer address from the ASGI scope (absent behind some test clients)."""
+    return (scope.get("client") or ("?", 0))[0]
+
+
+def create_app() -> ASGIApp:
     """
-    Build the inner Starlette ASGI app (routes + CORS only).
+    Build the inner ASGI app (Starlette routes + CORS only).
     GleanAuthMiddleware is applied OUTSIDE this in create_asgi_app().
     """
-    mcp_server = create_mcp_server()
+    bitbucket = create_bitbucket_client()
+    mcp_server = create_mcp_server(bitbucket)
     sse_transport = SseServerTransport("/messages/")
 
     # ── Route Handlers ──────────────────────────────────────────────────────
 
-    async def handle_sse(request: Request) -> _NoopResponse:
+    async def sse_app(scope: Scope, receive: Receive, send: Send) -> None:
         """
         Establish the SSE connection for Glean's MCP host.
 
@@ -73,46 +89,34 @@ def create_app() -> Starlette:
           1. Sends 'http.response.start' (SSE headers + 200)
           2. Streams SSE events for the duration of the session
           3. Closes cleanly when the connection drops
-
-        We return _NoopResponse to prevent Starlette from sending a
-        second 'http.response.start' after connect_sse() exits.
         """
-        logger.info(f"New SSE connection from {request.client.host}")
-        async with sse_transport.connect_sse(
-            request.scope,
-            request.receive,
-            request._send,  # The raw Uvicorn send callable — not scope["send"]
-        ) as streams:
+        client_host = _client_host(scope)
+        logger.info("New SSE connection from %s", client_host)
+        async with sse_transport.connect_sse(scope, receive, send) as streams:
             await mcp_server.run(
                 streams[0],
                 streams[1],
                 mcp_server.create_initialization_options(),
             )
-        logger.info(f"SSE connection closed for {request.client.host}")
-        return _NoopResponse()
+        logger.info("SSE connection closed for %s", client_host)
 
-    async def handle_messages(request: Request) -> _NoopResponse:
+    async def messages_app(scope: Scope, receive: Receive, send: Send) -> None:
         """
         Accept an incoming MCP message from Glean over the SSE session.
 
         SseServerTransport.handle_post_message() sends the 202 Accepted
-        response itself via the send callable. We return _NoopResponse
-        to prevent Starlette from sending a duplicate response.
-
-        NOTE: If you are on an older MCP SDK version where handle_post_message
-        does NOT send a response, swap _NoopResponse for:
-          return Response("Accepted", status_code=202)
+        response itself via the send callable.
         """
-        await sse_transport.handle_post_message(
-            request.scope,
-            request.receive,
-            request._send,
-        )
-        return _NoopResponse()
-
-    async def health_check(request: Request) -> JSONResponse:
+        await sse_transport.handle_post_message(scope, receive, send)
+
+    # Constant body — built once, not re-serialized per health probe
+    health_response = Response(
+        orjson.dumps({"status": "healthy"}), media_type="application/json"
+    )
+
+    async def health_check(request: Request) -> Response:
         """Health check endpoint for Cloud Run / load balancers."""
-        return JSONResponse({"status": "healthy"})
+        return health_response
 
     # ── Starlette App (CORS only — auth is applied outside) ────────────────
 
@@ -130,39 +134,65 @@ def create_app() -> Starlette:
     if not allowed_origins:
         allowed_origins = ["*"]
 
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        """Release pooled outbound connections on shutdown."""
+        yield
+        await bitbucket.close()
+        await close_http_client()
+        await close_redis_client()
+
     starlette_app = Starlette(
+        lifespan=lifespan,
         routes=[
             Route("/health", health_check),
-            Route("/sse", handle_sse),
-            Route("/messages/", handle_messages, methods=["POST"]),
-        ],
-        middleware=[
-            # CORS only — GleanAuthMiddleware is applied outside Starlette
-            # so it doesn't go through Starlette's middleware wrapping machinery.
-            Middleware(
-                CORSMiddleware,
-                allow_origins=allowed_origins,
-                allow_methods=["GET", "POST"],
-                allow_headers=["*"],
-            ),
+            Route("/sse", _ASGIEndpoint(sse_app), methods=["GET"]),
+            Route("/messages/", _ASGIEndpoint(messages_app), methods=["POST"]),
         ],
     )
 
-    return starlette_app
+    # CORS only — GleanAuthMiddleware is applied outside Starlette
+    # so it doesn't go through Starlette's middleware wrapping machinery.
+    cors_app = CORSMiddleware(
+        starlette_app,
+        allow_origins=allowed_origins,
+        allow_methods=["GET", "POST"],
+        allow_headers=["*"],
+    )
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Route health probes straight to Starlette. Load balancers never
+        send browser CORS requests, so the CORS layer is skipped for them.
+        /sse and /messages/ keep CORS because the Agent Builder UI calls
+        them from the browser.
+        """
+        if scope["type"] == "http" and scope["path"] in _NO_CORS_PATHS:
+            await starlette_app(scope, receive, send)
+        else:
+            await cors_app(scope, receive, send)
+
+    return app
 
 
 def create_asgi_app():
     """
     Compose the full ASGI app:
       GleanAuthMiddleware (pure ASGI, outermost)
-        └── CORSMiddleware (Starlette)
-              └── Starlette routes (SSE, messages, health)
+        ├── CORSMiddleware (Starlette)
+        │     └── Starlette routes (SSE, messages)
+        └── Starlette routes (health — no CORS)
 
     GleanAuthMiddleware is applied HERE, outside Starlette's middleware
     stack, to guarantee it uses pure ASGI __call__(scope, receive, send)
     without any response buffering that BaseHTTPMiddleware would add.
+
+    With AUTH_MODE=none the middleware would only pass every request
+    through, so it is not installed at all.
     """
     inner_app = create_app()
+    if settings.auth_mode == "none":
+        return inner_app
     return GleanAuthMiddleware(inner_app)
 
 
@@ -175,6 +205,10 @@ if __name__ == "__main__":
         host=settings.mcp_server_host,
         port=settings.mcp_server_port,
         log_level=settings.log_level.lower(),
+        # Pin the C-accelerated event loop and HTTP parser rather than
+        # relying on auto-detection falling back to asyncio / h11.
+        loop="uvloop",
+        http="httptools",
         # Never enable reload in production — it restarts the process and
         # drops all active SSE sessions.
         reload=False,
@@ -8,23 +8,454 @@ Each tool corresponds to a step in the PR review workflow:
 4. update_pull_request_description → Enrich PR with context
 5. get_file_content → Read style guides / docs
 6. list_pull_request_comments → See existing review comments
+7. review_pr_bundle → PR metadata, diff and comments in one call
+8. get_pr_files → Changed files (optionally with content) at the source commit
 """
 
-import json
+import asyncio
 import logging
+from functools import lru_cache
+import httpx
+import orjson
 from mcp.server import Server
 from mcp.types import Tool, TextContent
-from src.bitbucket_client import BitbucketClient
+from src.bitbucket_client import (
+    BitbucketClient,
+    create_http_client,
+    dumps_json,
+    file_skipped_notice,
+    is_commit_ref,
+)
 from src.auth import BitbucketAuth
+from src.cache import LRUCache
+from src.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Refs that mean "no real ref given" — overridden by the PR source commit
+# when pr_id is present, otherwise replaced with "main"
+_INVALID_REFS = frozenset(
+    {
+        None,
+        "",
+        "main",
+        "source_commit",  # ← agent passes field name instead of value
+        "source_branch",  # ← other common literal placeholders
+        "commit_hash",
+        "branch_name",
+        "ref",
+    }
+)
 
-def create_mcp_server() -> Server:
-    """Create and configure the MCP server with Bitbucket tools."""
+# get_pull_request answers are reused briefly — agents tend to re-fetch the
+# same PR several times within one review
+_PR_SUMMARY_CACHE_SIZE = 64
+_PR_SUMMARY_TTL = 60.0
+
+# Shared stand-in for absent nested objects in API payloads (read-only)
+_EMPTY: dict = {}
+
+# get_pr_files reads contents this many files at a time, so it can stop
+# once max_chars is used up instead of downloading the whole PR
+_CONTENT_BATCH = 10
+
+# Result `_meta.cache_hint` for MCP hosts: whether a reply may be reused
+# across calls (immutable data) or reflects live PR state
+_CACHEABLE = {"cache_hint": "cache"}
+_NO_CACHE = {"cache_hint": "no-cache"}
+
+# Fixed tool replies, built once and returned as-is
+_DESCRIPTION_UPDATED = [
+    TextContent(type="text", text="PR description updated successfully.")
+]
+
+_RATE_LIMITED = [
+    TextContent(
+        type="text",
+        text=(
+            "Error: Bitbucket API rate limit reached. "
+            "Wait a few minutes before retrying."
+        ),
+    )
+]
+
+# Longest string argument value written to the audit log
+_LOG_VALUE_MAX = 200
+
+
+def _log_extra(name: str, e: Exception) -> dict:
+    """Structured fields attached to tool error records for log sinks."""
+    return {"tool": name, "err_type": type(e).__name__}
+
+
+def _internal_error(name: str, e: Exception) -> list[TextContent]:
+    """Reply for an unexpected failure inside a tool."""
+    return [
+        TextContent(
+            type="text",
+            text=f"Internal error executing '{name}': {e}. Please try again.",
+        )
+    ]
+
+
+@lru_cache(maxsize=64)
+def _unknown_tool_reply(name: str) -> list[TextContent]:
+    """
+    Reply for a tool name we don't serve. Cached per name, so an agent
+    stuck retrying a typo logs one warning instead of one per call.
+    """
+    logger.warning("Unknown tool requested: %s", name)
+    return [TextContent(type="text", text=f"Unknown tool: {name}")]
+
+
+def _content_error(error: Exception | None) -> str:
+    """Short per-file reason a get_pr_files content read came back empty."""
+    if error is None:
+        return "404"  # not present at the source commit
+    if isinstance(error, PermissionError):
+        return "403"
+    if isinstance(error, httpx.HTTPStatusError):
+        return str(error.response.status_code)
+    return type(error).__name__  # transport failure, e.g. ReadTimeout
+
+
+def _field_chars(key: str, value) -> int:
+    """Chars one more key/value adds to a compact JSON object (incl. ",")."""
+    return len(dumps_json({key: value})) - 1
+
+
+def _loggable_args(arguments: dict) -> str:
+    """
+    Tool arguments as JSON for the audit log, with long strings (comment
+    bodies, PR descriptions) cut to _LOG_VALUE_MAX characters.
+    """
+    return orjson.dumps(
+        {
+            k: (
+                v[:_LOG_VALUE_MAX] + "…"
+                if isinstance(v, str) and len(v) > _LOG_VALUE_MAX
+                else v
+            )
+            for k, v in arguments.items()
+        },
+        default=str,
+    ).decode()
+
+
+def _dig(d: dict, keys: tuple[str, ...]):
+    """Follow keys into nested dicts; None as soon as a level is missing."""
+    for key in keys:
+        if not isinstance(d, dict):
+            return None
+        d = d.get(key)
+    return d
+
+
+# Summary field → path into the Bitbucket PR payload.
+# FIX: expose both source_branch and source_commit so the
+# agent can pass source_commit as `ref` to get_file_content.
+# Commit hash is preferred — it's immutable and unambiguous.
+_PR_FIELD_PATHS: dict[str, tuple[str, ...]] = {
+    "title": ("title",),
+    "description": ("description",),
+    "state": ("state",),
+    "author": ("author", "display_name"),
+    "source_branch": ("source", "branch", "name"),
+    "source_commit": ("source", "commit", "hash"),
+    "destination_branch": ("destination", "branch", "name"),
+    "destination_commit": ("destination", "commit", "hash"),
+    "reviewers": ("reviewers",),
+    "created_on": ("created_on",),
+    "updated_on": ("updated_on",),
+    "comment_count": ("comment_count",),
+    "link": ("links", "html", "href"),
+}
+
+
+def _project_pull_request(result: dict) -> dict:
+    """The fields of a Bitbucket PR that the agent needs."""
+    summary = {field: _dig(result, path) for field, path in _PR_FIELD_PATHS.items()}
+    summary["reviewers"] = [r.get("display_name") for r in summary["reviewers"] or ()]
+    return summary
+
+
+def _project_comment(c: dict) -> dict:
+    """The fields of a Bitbucket comment that the agent needs."""
+    return {
+        "id": c.get("id"),
+        "author": (c.get("user") or _EMPTY).get("display_name"),
+        "content": (c.get("content") or _EMPTY).get("raw", ""),
+        "created_on": c.get("created_on"),
+        "inline": c.get("inline"),
+    }
+
+
+# Input properties shared by most tools. Schemas are read-only JSON to MCP
+# consumers, so the tools reference these dicts rather than copying them.
+_WORKSPACE_PROP = {"type": "string", "description": "Bitbucket workspace slug"}
+_REPO_SLUG_PROP = {"type": "string", "description": "Repository slug"}
+_PR_ID_PROP = {"type": "integer", "description": "Pull request ID number"}
+
+# Tool definitions are static, so the list is built once at import time and
+# every discovery call returns the same objects.
+_TOOLS: list[Tool] = [
+    Tool(
+        name="get_pull_request",
+        description=(
+            "Fetch full details of a Bitbucket pull request "
+            "including title, description, author, reviewers, "
+            "source/destination branches, and approval state. "
+            "Call this (or review_pr_bundle) first when reviewing a PR — "
+            "the response includes 'source_branch' and 'source_commit' "
+            "which MUST be passed as the 'ref' when calling "
+            "get_file_content for any files changed in the PR."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+            },
+            "required": ["workspace", "repo_slug", "pr_id"],
+        },
+    ),
+    Tool(
+        name="get_pull_request_diff",
+        description=(
+            "Fetch the unified diff (code changes) of a "
+            "Bitbucket pull request. Returns the raw diff "
+            "text showing all added, modified, and deleted "
+            "lines. Essential for code review analysis."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+            },
+            "required": ["workspace", "repo_slug", "pr_id"],
+        },
+    ),
+    Tool(
+        name="get_file_content",
+        description=(
+            "Read the content of a file from a Bitbucket repository. "
+            "Useful for fetching style guides, linting configurations, "
+            "CONTRIBUTING.md, or any file changed in the PR. "
+            "ALWAYS pass pr_id when reading files changed in a PR — "
+            "the server will automatically resolve the correct source "
+            "commit as the ref. Do NOT pass a ref parameter for PR files."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "file_path": {
+                    "type": "string",
+                    "description": "Path to the file (e.g. 'src/hello.py')",
+                },
+                "pr_id": {
+                    "type": "integer",
+                    "description": (
+                        "PR ID — when provided, the server auto-resolves "
+                        "the correct source commit as the ref. Always pass "
+                        "this when reading files changed in the PR."
+                    ),
+                },
+                "ref": {
+                    "type": "string",
+                    "description": (
+                        "Branch or commit ref. Only use this for files on "
+                        "main that are NOT part of the PR (e.g. style guides). "
+                        "For PR files, pass pr_id instead and omit this field."
+                    ),
+                },
+            },
+            "required": ["workspace", "repo_slug", "file_path"],
+        },
+    ),
+    Tool(
+        name="list_pull_request_comments",
+        description=(
+            "List all existing comments on a Bitbucket pull "
+            "request. Use this to check what feedback has "
+            "already been provided before adding new comments."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+            },
+            "required": ["workspace", "repo_slug", "pr_id"],
+        },
+    ),
+    Tool(
+        name="add_pull_request_comment",
+        description=(
+            "Add a review comment to a Bitbucket pull request. "
+            "Can be a general comment or an inline comment on "
+            "a specific file and line. Use this to post code "
+            "review feedback, style guide violations, or "
+            "improvement suggestions."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+                "content": {
+                    "type": "string",
+                    "description": "Comment text in Markdown format",
+                },
+                "inline_path": {
+                    "type": "string",
+                    "description": "File path for inline comment (optional)",
+                },
+                "inline_line": {
+                    "type": "integer",
+                    "description": "Line number for inline comment (optional)",
+                },
+            },
+            "required": ["workspace", "repo_slug", "pr_id", "content"],
+        },
+    ),
+    Tool(
+        name="update_pull_request_description",
+        description=(
+            "Update the description (and optionally title) of "
+            "a Bitbucket pull request. Use this to enrich the "
+            "PR with contextual information from the codebase "
+            "and documentation."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+                "description": {
+                    "type": "string",
+                    "description": "New PR description in Markdown",
+                },
+                "title": {
+                    "type": "string",
+                    "description": "New PR title (optional)",
+                },
+            },
+            "required": ["workspace", "repo_slug", "pr_id", "description"],
+        },
+    ),
+    Tool(
+        name="review_pr_bundle",
+        description=(
+            "Fetch everything needed to start reviewing a Bitbucket pull "
+            "request in one call: the PR details (as get_pull_request), "
+            "the diff manifest (as get_pull_request_diff) and existing "
+            "comments (as list_pull_request_comments), fetched in parallel, "
+            "plus 'source_ref' — the commit to pass as 'ref' to "
+            "get_file_content for files changed in the PR. This is the "
+            "preferred first call when reviewing a PR; use it instead of "
+            "calling those three tools separately."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+            },
+            "required": ["workspace", "repo_slug", "pr_id"],
+        },
+    ),
+    Tool(
+        name="get_pr_files",
+        description=(
+            "List the files changed in a Bitbucket pull request together "
+            "with 'source_commit', in one call. Each file has its path, "
+            "change_type and fetchable flag. Set include_content=true to "
+            "also get the content of every fetchable file at the source "
+            "commit, read in parallel — this replaces separate "
+            "get_file_content calls for the PR's files."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "workspace": _WORKSPACE_PROP,
+                "repo_slug": _REPO_SLUG_PROP,
+                "pr_id": _PR_ID_PROP,
+                "include_content": {
+                    "type": "boolean",
+                    "description": (
+                        "Also return file contents (default false). Contents "
+                        "past the size limit are omitted and flagged; files "
+                        "that could not be read carry 'content_error'."
+                    ),
+                },
+            },
+            "required": ["workspace", "repo_slug", "pr_id"],
+        },
+    ),
+]
+
+
+# MCP_TOOL_GROUPS selects which of these are exposed; unset exposes all.
+# Fewer tools means a smaller tool list in every LLM turn.
+_TOOL_GROUPS: dict[str, frozenset[str]] = {
+    "read": frozenset(
+        {
+            "get_pull_request",
+            "get_pull_request_diff",
+            "get_file_content",
+            "list_pull_request_comments",
+            "review_pr_bundle",
+            "get_pr_files",
+        }
+    ),
+    "comment": frozenset({"add_pull_request_comment"}),
+    "write": frozenset({"update_pull_request_description"}),
+}
+
+
+def _enabled_tool_names(groups: str) -> frozenset[str]:
+    """Tool names for a comma-separated group list ("" → every tool)."""
+    selected = [g.strip() for g in groups.split(",") if g.strip()]
+    if not selected:
+        return frozenset(tool.name for tool in _TOOLS)
+    unknown = set(selected) - _TOOL_GROUPS.keys()
+    if unknown:
+        raise ValueError(
+            f"Unknown MCP_TOOL_GROUPS: {', '.join(sorted(unknown))}. "
+            f"Valid groups: {', '.join(_TOOL_GROUPS)}"
+        )
+    return frozenset().union(*(_TOOL_GROUPS[g] for g in selected))
+
+
+def create_bitbucket_client() -> BitbucketClient:
+    """Build a BitbucketClient whose auth and API calls share one pool."""
+    http = create_http_client()
+    return BitbucketClient(BitbucketAuth(http), http)
+
+
+def create_mcp_server(client: BitbucketClient | None = None) -> Server:
+    """
+    Create and configure the MCP server with Bitbucket tools.
+
+    Pass a client to control its lifetime (e.g. close it on app shutdown);
+    otherwise one is created for the server.
+    """
     server = Server("bitbucket-pr-review")
-    auth = BitbucketAuth()
-    client = BitbucketClient(auth)
+    client = client or create_bitbucket_client()
+    settings = get_settings()
+    enabled = _enabled_tool_names(settings.mcp_tool_groups)
+    tools = [tool for tool in _TOOLS if tool.name in enabled]
+    # (workspace, repo_slug, pr_id) → serialized get_pull_request result
+    pr_summaries = LRUCache(maxsize=_PR_SUMMARY_CACHE_SIZE)
 
     # ── Tool Discovery ──────────────────────────────────────────────────────
     @server.list_tools()
@@ -34,212 +465,241 @@ def create_mcp_server() -> Server:
         Glean's Agent Builder will display these tools and the
         LLM will decide which to call based on descriptions.
         """
+        return tools
+
+    # ── Tool Handlers ───────────────────────────────────────────────────────
+
+    async def handle_get_pull_request(arguments: dict) -> list[TextContent]:
+        key = (arguments["workspace"], arguments["repo_slug"], arguments["pr_id"])
+        cached = pr_summaries.get(key)
+        if cached is not None:
+            return cached
+
+        result = await client.get_pull_request(*key)
+        summary = _project_pull_request(result)
+        # Cache the finished response, so hits skip projection and JSON too
+        response = [TextContent(type="text", text=dumps_json(summary), _meta=_NO_CACHE)]
+        pr_summaries.set(key, response, ttl=_PR_SUMMARY_TTL)
+        return response
+
+    async def handle_get_pull_request_diff(arguments: dict) -> list[TextContent]:
+        diff = await client.get_pull_request_diff(
+            arguments["workspace"],
+            arguments["repo_slug"],
+            arguments["pr_id"],
+        )
+        # The diff moves whenever the PR source branch is pushed
+        return [TextContent(type="text", text=diff, _meta=_NO_CACHE)]
+
+    async def handle_get_file_content(arguments: dict) -> list[TextContent]:
+        workspace = arguments["workspace"]
+        repo_slug = arguments["repo_slug"]
+        file_path = arguments["file_path"]
+        ref = arguments.get("ref")
+        pr_id = arguments.get("pr_id")
+
+        # A commit hash (7-40 hex chars) already names what the agent wants —
+        # no need to look up the PR.
+        # The SDK validates arguments against inputSchema, so pr_id is an int
+        # and ref a str here.
+        if pr_id and not is_commit_ref(ref):
+            try:
+                resolved_ref = await client.get_pr_source_ref(
+                    workspace, repo_slug, pr_id
+                )
+            except (httpx.HTTPError, ValueError, PermissionError) as ref_err:
+                resolved_ref = None
+                logger.warning(
+                    "Could not auto-resolve ref from PR #%s: %s", pr_id, ref_err
+                )
+            if resolved_ref:
+                if ref in _INVALID_REFS:
+                    logger.info(
+                        "Ref='%s' is a placeholder — overriding with "
+                        "PR #%s source commit: '%s'",
+                        ref,
+                        pr_id,
+                        resolved_ref,
+                    )
+                else:
+                    logger.info(
+                        "pr_id provided — using PR #%s source commit '%s' "
+                        "(agent passed ref='%s')",
+                        pr_id,
+                        resolved_ref,
+                        ref,
+                    )
+                ref = resolved_ref
+
+        # Final fallback — no pr_id, or the PR lookup failed
+        if ref in _INVALID_REFS:
+            ref = "main"
+
+        content = await client.find_file_content(
+            workspace,
+            repo_slug,
+            file_path,
+            ref,
+        )
+        if content is None:
+            # The file may yet appear at this ref (e.g. a later push)
+            return [
+                TextContent(
+                    type="text",
+                    text=file_skipped_notice(file_path, ref),
+                    _meta=_NO_CACHE,
+                )
+            ]
+        # Content at a full commit hash never changes; an abbreviated hash
+        # can become ambiguous and a branch can move
+        meta = _CACHEABLE if is_commit_ref(ref, full=True) else _NO_CACHE
+        return [TextContent(type="text", text=content, _meta=meta)]
+
+    async def handle_list_pull_request_comments(
+        arguments: dict,
+    ) -> list[TextContent]:
+        comments = await client.list_pull_request_comments(
+            arguments["workspace"],
+            arguments["repo_slug"],
+            arguments["pr_id"],
+        )
         return [
-            Tool(
-                name="get_pull_request",
-                description=(
-                    "Fetch full details of a Bitbucket pull request "
-                    "including title, description, author, reviewers, "
-                    "source/destination branches, and approval state. "
-                    "ALWAYS call this first when reviewing a PR — the "
-                    "response includes 'source_branch' and 'source_commit' "
-                    "which MUST be passed as the 'ref' when calling "
-                    "get_file_content for any files changed in the PR."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": "Pull request ID number",
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "pr_id"],
-                },
-            ),
-            Tool(
-                name="get_pull_request_diff",
-                description=(
-                    "Fetch the unified diff (code changes) of a "
-                    "Bitbucket pull request. Returns the raw diff "
-                    "text showing all added, modified, and deleted "
-                    "lines. Essential for code review analysis."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": "Pull request ID number",
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "pr_id"],
-                },
-            ),
-            Tool(
-                name="get_file_content",
-                description=(
-                    "Read the content of a file from a Bitbucket repository. "
-                    "Useful for fetching style guides, linting configurations, "
-                    "CONTRIBUTING.md, or any file changed in the PR. "
-                    "ALWAYS pass pr_id when reading files changed in a PR — "
-                    "the server will automatically resolve the correct source "
-                    "commit as the ref. Do NOT pass a ref parameter for PR files."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "file_path": {
-                            "type": "string",
-                            "description": "Path to the file (e.g. 'src/hello.py')",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": (
-                                "PR ID — when provided, the server auto-resolves "
-                                "the correct source commit as the ref. Always pass "
-                                "this when reading files changed in the PR."
-                            ),
-                        },
-                        "ref": {
-                            "type": "string",
-                            "description": (
-                                "Branch or commit ref. Only use this for files on "
-                                "main that are NOT part of the PR (e.g. style guides). "
-                                "For PR files, pass pr_id instead and omit this field."
-                            ),
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "file_path"],
-                },
-            ),
-            Tool(
-                name="list_pull_request_comments",
-                description=(
-                    "List all existing comments on a Bitbucket pull "
-                    "request. Use this to check what feedback has "
-                    "already been provided before adding new comments."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": "Pull request ID number",
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "pr_id"],
-                },
-            ),
-            Tool(
-                name="add_pull_request_comment",
-                description=(
-                    "Add a review comment to a Bitbucket pull request. "
-                    "Can be a general comment or an inline comment on "
-                    "a specific file and line. Use this to post code "
-                    "review feedback, style guide violations, or "
-                    "improvement suggestions."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": "Pull request ID number",
-                        },
-                        "content": {
-                            "type": "string",
-                            "description": "Comment text in Markdown format",
-                        },
-                        "inline_path": {
-                            "type": "string",
-                            "description": "File path for inline comment (optional)",
-                        },
-                        "inline_line": {
-                            "type": "integer",
-                            "description": "Line number for inline comment (optional)",
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "pr_id", "content"],
-                },
-            ),
-            Tool(
-                name="update_pull_request_description",
-                description=(
-                    "Update the description (and optionally title) of "
-                    "a Bitbucket pull request. Use this to enrich the "
-                    "PR with contextual information from the codebase "
-                    "and documentation."
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "workspace": {
-                            "type": "string",
-                            "description": "Bitbucket workspace slug",
-                        },
-                        "repo_slug": {
-                            "type": "string",
-                            "description": "Repository slug",
-                        },
-                        "pr_id": {
-                            "type": "integer",
-                            "description": "Pull request ID number",
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "New PR description in Markdown",
-                        },
-                        "title": {
-                            "type": "string",
-                            "description": "New PR title (optional)",
-                        },
-                    },
-                    "required": ["workspace", "repo_slug", "pr_id", "description"],
-                },
-            ),
+            TextContent(
+                type="text",
+                text=dumps_json([_project_comment(c) for c in comments]),
+                _meta=_NO_CACHE,
+            )
+        ]
+
+    def invalidate_pull_request(arguments: dict) -> None:
+        """Forget everything cached about a PR once a write to it succeeds."""
+        key = (arguments["workspace"], arguments["repo_slug"], arguments["pr_id"])
+        pr_summaries.pop(key)
+        client.invalidate_pull_request(*key)
+
+    async def handle_add_pull_request_comment(arguments: dict) -> list[TextContent]:
+        result = await client.add_pull_request_comment(
+            arguments["workspace"],
+            arguments["repo_slug"],
+            arguments["pr_id"],
+            arguments["content"],
+            arguments.get("inline_path"),
+            arguments.get("inline_line"),
+        )
+        invalidate_pull_request(arguments)
+        return [
+            TextContent(
+                type="text",
+                text=f"Comment posted successfully. ID: {result.get('id')}",
+            )
         ]
 
+    async def handle_update_pull_request_description(
+        arguments: dict,
+    ) -> list[TextContent]:
+        await client.update_pull_request_description(
+            arguments["workspace"],
+            arguments["repo_slug"],
+            arguments["pr_id"],
+            arguments["description"],
+            arguments.get("title"),
+        )
+        invalidate_pull_request(arguments)
+        return _DESCRIPTION_UPDATED
+
+    async def handle_review_pr_bundle(arguments: dict) -> list[TextContent]:
+        args = (arguments["workspace"], arguments["repo_slug"], arguments["pr_id"])
+        # Three independent round trips — run them concurrently
+        pr, diff, comments = await asyncio.gather(
+            client.get_pull_request(*args),
+            client.get_pull_request_diff(*args),
+            client.list_pull_request_comments(*args),
+        )
+        bundle = {
+            # get_pull_request just primed the ref cache, so this is local
+            "source_ref": await client.get_pr_source_ref(*args),
+            "pr": _project_pull_request(pr),
+            # Already-serialized manifest, embedded without re-parsing
+            "diff": orjson.Fragment(diff),
+            "comments": [_project_comment(c) for c in comments],
+        }
+        return [TextContent(type="text", text=dumps_json(bundle), _meta=_NO_CACHE)]
+
+    async def handle_get_pr_files(arguments: dict) -> list[TextContent]:
+        workspace, repo_slug = arguments["workspace"], arguments["repo_slug"]
+        args = (workspace, repo_slug, arguments["pr_id"])
+        source_ref, (files, truncated) = await asyncio.gather(
+            client.get_pr_source_ref(*args),
+            client.get_pull_request_files(*args),
+        )
+        entries = [
+            {
+                "path": f["filename"],
+                "old_path": f["old_filename"],
+                "change_type": f["change_type"],
+                "fetchable": f["fetchable"],
+            }
+            for f in files
+        ]
+
+        result = {"source_commit": source_ref, "files": entries}
+        if truncated:
+            result["truncated"] = True
+
+        if arguments.get("include_content") and source_ref:
+            fetchable = [e for e in entries if e["fetchable"]]
+            # Keep the serialized reply within max_chars, like the diff
+            # manifest: measure it with every fetchable file marked omitted,
+            # then charge each swap of that marker for content or an error.
+            # Sizes are unknown until read, so fetch a batch at a time and
+            # stop scheduling reads once a file no longer fits.
+            for e in fetchable:
+                e["content_omitted"] = True
+            budget = settings.max_chars - len(dumps_json(result))
+            omitted_chars = _field_chars("content_omitted", True)
+            spent = budget <= 0
+            for start in range(0, len(fetchable), _CONTENT_BATCH):
+                if spent:
+                    break
+                batch = fetchable[start : start + _CONTENT_BATCH]
+                contents = await client.get_file_contents(
+                    workspace,
+                    repo_slug,
+                    [e["path"] for e in batch],
+                    source_ref,
+                    concurrency=_CONTENT_BATCH,
+                )
+                for e in batch:
+                    content = contents[e["path"]]
+                    if isinstance(content, str):
+                        key, value = "content", content
+                    else:
+                        key, value = "content_error", _content_error(content)
+                    cost = _field_chars(key, value) - omitted_chars
+                    # Errors are a few chars and always reported
+                    if key == "content" and (spent or cost > budget):
+                        spent = True
+                        continue
+                    del e["content_omitted"]
+                    e[key] = value
+                    budget -= cost
+
+        return [TextContent(type="text", text=dumps_json(result), _meta=_NO_CACHE)]
+
+    # Tool name → handler; one dict lookup replaces the if/elif chain
+    handlers = {
+        "get_pull_request": handle_get_pull_request,
+        "get_pull_request_diff": handle_get_pull_request_diff,
+        "get_file_content": handle_get_file_content,
+        "list_pull_request_comments": handle_list_pull_request_comments,
+        "add_pull_request_comment": handle_add_pull_request_comment,
+        "update_pull_request_description": handle_update_pull_request_description,
+        "review_pr_bundle": handle_review_pr_bundle,
+        "get_pr_files": handle_get_pr_files,
+    }
+    # Disabled tools are answered as unknown, not just hidden from discovery
+    handlers = {name: h for name, h in handlers.items() if name in enabled}
+
     # ── Tool Execution ──────────────────────────────────────────────────────
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[TextContent]:
@@ -249,174 +709,56 @@ def create_mcp_server() -> Server:
         ALL errors are caught and returned as structured TextContent —
         never raised — to prevent ASGI SSE connection crashes.
         """
-        logger.info(
-            f"Tool called: {name} with args: {json.dumps(arguments, default=str)}"
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Tool called: %s with args: %s", name, _loggable_args(arguments)
+            )
+        handler = handlers.get(name)
+        if handler is None:
+            return _unknown_tool_reply(name)
+
         try:
-            # ── get_pull_request ──────────────────────────────────────────
-            if name == "get_pull_request":
-                result = await client.get_pull_request(
-                    arguments["workspace"],
-                    arguments["repo_slug"],
-                    arguments["pr_id"],
-                )
-                # FIX: expose both source_branch and source_commit so the
-                # agent can pass source_commit as `ref` to get_file_content.
-                # Commit hash is preferred — it's immutable and unambiguous.
-                summary = {
-                    "title": result.get("title"),
-                    "description": result.get("description"),
-                    "state": result.get("state"),
-                    "author": result.get("author", {}).get("display_name"),
-                    "source_branch": (
-                        result.get("source", {}).get("branch", {}).get("name")
-                    ),
-                    "source_commit": (
-                        result.get("source", {}).get("commit", {}).get("hash")
-                    ),
-                    "destination_branch": (
-                        result.get("destination", {}).get("branch", {}).get("name")
-                    ),
-                    "destination_commit": (
-                        result.get("destination", {}).get("commit", {}).get("hash")
-                    ),
-                    "reviewers": [
-                        r.get("display_name") for r in result.get("reviewers", [])
-                    ],
-                    "created_on": result.get("created_on"),
-                    "updated_on": result.get("updated_on"),
-                    "comment_count": result.get("comment_count"),
-                    "link": result.get("links", {}).get("html", {}).get("href"),
-                }
-                return [TextContent(type="text", text=json.dumps(summary, indent=2))]
-
-            # ── get_pull_request_diff ─────────────────────────────────────
-            elif name == "get_pull_request_diff":
-                diff = await client.get_pull_request_diff(
-                    arguments["workspace"],
-                    arguments["repo_slug"],
-                    arguments["pr_id"],
-                )
-                return [TextContent(type="text", text=diff)]
-
-            # ── get_file_content ──────────────────────────────────────────
-            elif name == "get_file_content":
-                workspace = arguments["workspace"]
-                repo_slug = arguments["repo_slug"]
-                file_path = arguments["file_path"]
-                ref = arguments.get("ref")
-                pr_id = arguments.get("pr_id")
-
-                INVALID_REFS = {
-                    None,
-                    "",
-                    "main",
-                    "source_commit",  # ← agent passes field name instead of value
-                    "source_branch",  # ← other common literal placeholders
-                    "commit_hash",
-                    "branch_name",
-                    "ref",
-                }
-
-                if pr_id:
-                    try:
-                        resolved_ref = await client.get_pr_source_ref(
-                            workspace, repo_slug, int(pr_id)
-                        )
-                        if resolved_ref:
-                            if ref in INVALID_REFS:
-                                logger.info(
-                                    f"Ref='{ref}' is a placeholder — overriding with "
-                                    f"PR #{pr_id} source commit: '{resolved_ref}'"
-                                )
-                            else:
-                                logger.info(
-                                    f"pr_id provided — using PR #{pr_id} source "
-                                    f"commit '{resolved_ref}' (agent passed ref='{ref}')"
-                                )
-                            ref = resolved_ref
-                    except Exception as ref_err:
-                        logger.warning(
-                            f"Could not auto-resolve ref from PR #{pr_id}: {ref_err}. "
-                            f"Falling back to ref='{ref or 'main'}'"
-                        )
-
-                # Final fallback — only reached if no pr_id was provided
-                if ref in INVALID_REFS:
-                    ref = "main"
-
-                content = await client.get_file_content(
-                    workspace,
-                    repo_slug,
-                    file_path,
-                    ref,
-                )
-                return [TextContent(type="text", text=content)]
-
-            # ── list_pull_request_comments ────────────────────────────────
-            elif name == "list_pull_request_comments":
-                comments = await client.list_pull_request_comments(
-                    arguments["workspace"],
-                    arguments["repo_slug"],
-                    arguments["pr_id"],
+            return await handler(arguments)
+
+        # ── Error handling — NEVER raise, always return TextContent ────────
+        except ValueError as e:
+            logger.warning(
+                "Validation error in %s: %s", name, e, extra=_log_extra(name, e)
+            )
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+        except PermissionError as e:
+            logger.error(
+                "Permission error in %s: %s", name, e, extra=_log_extra(name, e)
+            )
+            return [TextContent(type="text", text=f"Permission denied: {e}")]
+
+        except httpx.HTTPStatusError as e:
+            # Client errors (rate limits above all) come in bursts and their
+            # cause is in the status line — skip the traceback for those
+            status = e.response.status_code
+            if status == 429:
+                logger.warning(
+                    "Bitbucket rate limit hit in %s", name, extra=_log_extra(name, e)
                 )
-                summary = [
-                    {
-                        "id": c.get("id"),
-                        "author": c.get("user", {}).get("display_name"),
-                        "content": c.get("content", {}).get("raw", ""),
-                        "created_on": c.get("created_on"),
-                        "inline": c.get("inline"),
-                    }
-                    for c in comments
-                ]
-                return [TextContent(type="text", text=json.dumps(summary, indent=2))]
-
-            # ── add_pull_request_comment ──────────────────────────────────
-            elif name == "add_pull_request_comment":
-                result = await client.add_pull_request_comment(
-                    arguments["workspace"],
-                    arguments["repo_slug"],
-                    arguments["pr_id"],
-                    arguments["content"],
-                    arguments.get("inline_path"),
-                    arguments.get("inline_line"),
+                return _RATE_LIMITED
+            if status < 500:
+                logger.warning(
+                    "Bitbucket returned HTTP %s in %s",
+                    status,
+                    name,
+                    extra=_log_extra(name, e),
                 )
                 return [
                     TextContent(
                         type="text",
-                        text=f"Comment posted successfully. ID: {result.get('id')}",
+                        text=f"Error: Bitbucket returned HTTP {status} for '{name}'.",
                     )
                 ]
-
-            # ── update_pull_request_description ──────────────────────────
-            elif name == "update_pull_request_description":
-                await client.update_pull_request_description(
-                    arguments["workspace"],
-                    arguments["repo_slug"],
-                    arguments["pr_id"],
-                    arguments["description"],
-                    arguments.get("title"),
-                )
-                return [
-                    TextContent(
-                        type="text", text="PR description updated successfully."
-                    )
-                ]
-
-            # ── Unknown tool ──────────────────────────────────────────────
-            else:
-                logger.warning(f"Unknown tool requested: {name}")
-                return [TextContent(type="text", text=f"Unknown tool: {name}")]
-
-        # ── Error handling — NEVER raise, always return TextContent ────────
-        except ValueError as e:
-            logger.warning(f"Validation error in {name}: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
-
-        except PermissionError as e:
-            logger.error(f"Permission error in {name}: {e}")
-            return [TextContent(type="text", text=f"Permission denied: {str(e)}")]
+            logger.exception(
+                "Bitbucket server error in %s", name, extra=_log_extra(name, e)
+            )
+            return _internal_error(name, e)
 
         except Exception as e:
             # CRITICAL: catching here prevents the exception from propagating
@@ -424,12 +766,7 @@ def create_mcp_server() -> Server:
             # send an HTTP 500 response on an already-open SSE stream,
             # crashing the ASGI app with:
             # RuntimeError: Unexpected ASGI message 'http.response.start'
-            logger.exception(f"Unexpected error in {name}")
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Internal error executing '{name}': {str(e)}. Please try again.",
-                )
-            ]
+            logger.exception("Unexpected error in %s", name, extra=_log_extra(name, e))
+            return _internal_error(name, e)
 
     return server